@@ -12,17 +12,21 @@ SUITS = ["Hearts", "Diamonds", "Clubs", "Spades"]
 # (Same idea: ranks are sent as numbers in the protocol, so the mapping must be stable.)
 RANKS = list(range(1, 14))  # 1..13 (A=1, J=11,Q=12,K=13)
 
+# Card encoding (in-memory only, the wire format still carries rank and suit separately):
+# a card is a single small int (rank << 2) | suit, so rank = card >> 2 and suit = card & 3.
+
+
+# Card value per rank, indexed directly by rank (index 0 is unused).
+# Blackjack-like value rules (as required by the assignment):
+# - Ace is ALWAYS 11 here (no "soft ace" logic that can switch to 1).
+# - Face cards (J/Q/K) are 10.
+# - Number cards are their number (2..10).
+_VAL = (0, 11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)
+
 
 def card_value(rank: int) -> int:
-    # Blackjack-like value rules (as required by the assignment):
-    # - Ace is ALWAYS 11 here (no "soft ace" logic that can switch to 1).
-    # - Face cards (J/Q/K) are 10.
-    # - Number cards are their number (2..10).
-    if rank == 1:
-        return 11
-    if 2 <= rank <= 10:
-        return rank
-    return 10
+    # Table lookup instead of a branch ladder; see _VAL above for the rules.
+    return _VAL[rank]
 
 
 def rank_to_str(rank: int) -> str:
@@ -38,13 +42,23 @@ def rank_to_str(rank: int) -> str:
     return str(rank)
 
 
+# Printable name of every card, precomputed once (only 52 exist).
+# Indexed by the packed card int (rank << 2) | suit, e.g. CARD_STR[(1 << 2) | 0] == "A of Hearts".
+# Slots 0..3 (rank 0) are unused.
+CARD_STR = ("",) * 4 + tuple(f"{rank_to_str(r)} of {SUITS[s]}" for r in RANKS for s in range(4))
+
+
+# Standard 52-card deck as packed card ints, built once at import:
+# - suit in 0..3, rank in 1..13, card = (rank << 2) | suit.
+_DECK_TEMPLATE = tuple((rank << 2) | suit for suit in range(4) for rank in RANKS)
+
+
 class Deck:
     def __init__(self):
-        # Create a standard 52-card deck as (rank, suit) tuples:
-        # - suit in 0..3, rank in 1..13.
-        # Card representation matches what the protocol sends to the client.
-        self.cards = [(rank, suit) for suit in range(4) for rank in RANKS]
-        random.shuffle(self.cards)  # In-place shuffle; randomness comes from Python's RNG.
+        # Copy the shared template, then shuffle in place. random.shuffle is already Fisher-Yates
+        # (with a cheaper index draw than randrange); randomness comes from Python's RNG.
+        self.cards = list(_DECK_TEMPLATE)
+        random.shuffle(self.cards)
 
     def draw(self):
         # Draw "top" card by popping from the end of the shuffled list.
@@ -55,22 +69,26 @@ class Deck:
 
 
 class Hand:
-    # Cards held by a player/dealer, stored as (rank, suit) tuples.
+    # Cards held by a player/dealer, stored as packed card ints.
     def __init__(self):
-        self.cards = []  # list of (rank, suit)
+        self.cards = []  # list of (rank << 2) | suit
+        self._total = 0  # running total, updated on every add()
+        self._parts = []  # display string of each card, in the same order as self.cards
 
     def add(self, card):
-        # Add a drawn card tuple (rank, suit) to the hand.
+        # Add a drawn packed card to the hand and update the running total.
         self.cards.append(card)
+        self._total += _VAL[card >> 2]
+        self._parts.append(CARD_STR[card])
 
     def total(self) -> int:
-        # Sum card values using card_value(); note that Ace is always 11 in this implementation.
-        return sum(card_value(rank) for rank, _ in self.cards)
+        # Sum of card values (kept incrementally); note that Ace is always 11 in this implementation.
+        return self._total
 
     def bust(self) -> bool:
         # "Bust" means total strictly greater than 21.
-        return self.total() > 21
+        return self._total > 21
 
     def __str__(self):
         # Human-readable representation used for prints/logs, e.g. "A of Hearts, 10 of Spades".
-        return ", ".join(f"{rank_to_str(r)} of {SUITS[s]}" for r, s in self.cards)
+        return ", ".join(self._parts)
@@ -14,7 +14,7 @@ from protocol import (
     unpack_payload_server,
 )
 # Import card helpers for display
-from cards import SUITS, rank_to_str
+from cards import CARD_STR
 
 
 def safe_send(conn: socket.socket, data: bytes) -> bool:
@@ -27,23 +27,28 @@ def safe_send(conn: socket.socket, data: bytes) -> bool:
         return False
 
 
-def recv_exact(conn: socket.socket, n: int, timeout_sec: float = 20.0) -> bytes:
+# SO_REUSEPORT is missing on some platforms (e.g. Windows); detect it once at import.
+_HAVE_REUSEPORT = hasattr(socket, "SO_REUSEPORT")
+
+# Reusable receive buffers: one server payload (9 bytes) and the initial deal (3 payloads = 27 bytes).
+# The client handles a single session at a time, so sharing them at module scope is safe.
+_BUF = bytearray(9)
+_MV = memoryview(_BUF)
+_DEAL_BUF = bytearray(27)
+_DEAL_MV = memoryview(_DEAL_BUF)
+
+
+def recv_exact_into(conn: socket.socket, mv: memoryview, n: int) -> None:
     """
-    Receive exactly n bytes from the server.
-    timeout_sec protects against a silent server.
+    Receive exactly n bytes from the server directly into mv[:n].
+    The socket timeout set once in main() protects against a silent server.
     """
-    old_timeout = conn.gettimeout()
-    conn.settimeout(timeout_sec)
-    try:
-        data = b""
-        while len(data) < n:
-            chunk = conn.recv(n - len(data))
-            if not chunk:
-                raise ConnectionError("Connection closed by peer")
-            data += chunk
-        return data
-    finally:
-        conn.settimeout(old_timeout)
+    off = 0
+    while off < n:
+        got = conn.recv_into(mv[off:n])
+        if not got:
+            raise ConnectionError("Connection closed by peer")
+        off += got
 
 
 def pretty_result(r: int) -> str:
@@ -59,9 +64,22 @@ def pretty_result(r: int) -> str:
 
 def recv_server_payload(conn: socket.socket):
     # Receive and unpack a single server payload
-    raw = recv_exact(conn, 9, timeout_sec=20.0)
+    recv_exact_into(conn, _MV, 9)
     try:
-        return unpack_payload_server(raw)  # validates cookie/type/structure inside protocol.py
+        return unpack_payload_server(_MV)  # validates cookie/type/structure inside protocol.py
+    except Exception as e:
+        raise ValueError(f"Bad server payload: {e}")
+
+
+def recv_initial_deal(conn: socket.socket):
+    # Receive the 3 initial payloads (2 player cards + dealer's open card) in one batched read
+    recv_exact_into(conn, _DEAL_MV, 27)
+    try:
+        return (
+            unpack_payload_server(_DEAL_BUF, 0),
+            unpack_payload_server(_DEAL_BUF, 9),
+            unpack_payload_server(_DEAL_BUF, 18),
+        )
     except Exception as e:
         raise ValueError(f"Bad server payload: {e}")
 
@@ -73,11 +91,14 @@ def listen_for_offer(timeout_sec: int = 15):
     """
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
-        try:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
-        except Exception:
-            pass
+        if _HAVE_REUSEPORT:
+            try:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except Exception:
+                pass
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Offers are 39-byte datagrams; a small receive buffer is plenty for this short-lived socket
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
         # Bind to UDP offer port
         s.bind(("", UDP_OFFER_PORT))
         s.settimeout(timeout_sec)
@@ -102,6 +123,12 @@ def listen_for_offer(timeout_sec: int = 15):
         s.close()
 
 
+def _show_card(tag, payload):
+    # Print card information nicely
+    res, rank, suit = payload
+    print(f"{tag}: {CARD_STR[(rank << 2) | suit]}  (msg_result={pretty_result(res)})", flush=True)
+
+
 def run_session(conn: socket.socket, rounds: int):
     # Track game statistics
     wins = losses = ties = 0
@@ -110,18 +137,11 @@ def run_session(conn: socket.socket, rounds: int):
         print(f"\n=== Round {r}/{rounds} ===", flush=True)
 
         # Receive initial cards
-        p1 = recv_server_payload(conn)
-        p2 = recv_server_payload(conn)
-        d1 = recv_server_payload(conn)
-
-        def show_card(tag, payload):
-            # Print card information nicely
-            res, rank, suit = payload
-            print(f"{tag}: {rank_to_str(rank)} of {SUITS[suit]}  (msg_result={pretty_result(res)})", flush=True)
+        p1, p2, d1 = recv_initial_deal(conn)
 
-        show_card("You", p1)
-        show_card("You", p2)
-        show_card("Dealer shows", d1)
+        _show_card("You", p1)
+        _show_card("You", p2)
+        _show_card("Dealer shows", d1)
 
         #Player decision loop
         while True:
@@ -132,7 +152,7 @@ def run_session(conn: socket.socket, rounds: int):
                     raise ConnectionError("Lost connection while sending HIT")
 
                 res, rank, suit = recv_server_payload(conn)
-                print(f"You drew: {rank_to_str(rank)} of {SUITS[suit]}", flush=True)
+                print(f"You drew: {CARD_STR[(rank << 2) | suit]}", flush=True)
 
                 if res == RESULT_LOSS:
                     print("You busted. Dealer wins this round.", flush=True)
@@ -146,23 +166,27 @@ def run_session(conn: socket.socket, rounds: int):
 
                 # Dealer reveals hidden card
                 res, rank, suit = recv_server_payload(conn)
-                print(f"Dealer reveals: {rank_to_str(rank)} of {SUITS[suit]}", flush=True)
+                print(f"Dealer reveals: {CARD_STR[(rank << 2) | suit]}", flush=True)
+                shown = (rank, suit)
 
-                # Dealer continues drawing until round ends
+                # Dealer continues drawing until round ends. The packet with the result repeats
+                # the dealer's last card, except on a dealer bust where it carries the busting card,
+                # so only print cards that were not shown yet (a deck has no duplicate cards).
                 while True:
                     res, rank, suit = recv_server_payload(conn)
-                    if res == RESULT_NOT_OVER:
-                        print(f"Dealer draws: {rank_to_str(rank)} of {SUITS[suit]}", flush=True)
-                        continue
-
-                    print(f"Round result: {pretty_result(res)}", flush=True)
-                    if res == RESULT_WIN:
-                        wins += 1
-                    elif res == RESULT_LOSS:
-                        losses += 1
-                    else:
-                        ties += 1
-                    break
+                    if (rank, suit) != shown:
+                        print(f"Dealer draws: {CARD_STR[(rank << 2) | suit]}", flush=True)
+                        shown = (rank, suit)
+                    if res != RESULT_NOT_OVER:
+                        break
+
+                print(f"Round result: {pretty_result(res)}", flush=True)
+                if res == RESULT_WIN:
+                    wins += 1
+                elif res == RESULT_LOSS:
+                    losses += 1
+                else:
+                    ties += 1
                 break
 
             else:
@@ -218,6 +242,12 @@ def main():
                 pass
             continue
 
+        # Disable Nagle: card/decision messages are tiny and must not wait for delayed ACKs
+        try:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except Exception:
+            pass
+
         # Send request packet
         req = pack_request(rounds, team)
         if not safe_send(conn, req + b"\n"):
@@ -227,8 +257,8 @@ def main():
                 pass
             continue
 
-        # Remove timeout during gameplay
-        conn.settimeout(None)
+        # Gameplay timeout, set once here instead of around every receive
+        conn.settimeout(20)
 
         try:
             run_session(conn, rounds)
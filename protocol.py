@@ -14,30 +14,41 @@ RESULT_WIN = 0x3           # Client won the round.
 
 UDP_OFFER_PORT = 13122     # Fixed UDP port used for server discovery offers.
 
+# Precompiled wire formats (parsed once at import instead of on every pack/unpack call).
+_OFFER = struct.Struct("!IBH32s")  # offer:          39 bytes
+_REQ = struct.Struct("!IBB32s")    # request:        38 bytes
+_CLI = struct.Struct("!IB5s")      # payload client: 10 bytes
+_SRV = struct.Struct("!IBBHB")     # payload server:  9 bytes
+
+# Server payload split for fast validation: fixed 5-byte header (cookie + type) and 4-byte body.
+_SRV_PREFIX = struct.pack("!IB", MAGIC_COOKIE, TYPE_PAYLOAD)
+_SRV_TAIL = struct.Struct("!BHB")  # result(1) | rank(2) | suit(1)
+
+# Client payload header (cookie + type), checked with one compare like the server payload.
+_CLI_PREFIX = _SRV_PREFIX
+
 
 def pack_name_32(name: str) -> bytes:
     # Encode name as UTF-8, truncate to 32 bytes, then NUL-pad to exactly 32 bytes.
-    b = name.encode("utf-8", errors="ignore")[:32]
-    return b + b"\x00" * (32 - len(b))
+    return name.encode("utf-8", errors="ignore")[:32].ljust(32, b"\x00")
 
 
 def unpack_name_32(b: bytes) -> str:
     # Take first 32 bytes, cut at first NUL, decode back to UTF-8 for display/logging.
-    b = b[:32].split(b"\x00", 1)[0]
-    return b.decode("utf-8", errors="ignore")
+    return b[:32].partition(b"\x00")[0].decode("utf-8", errors="ignore")
 
 
 # offer: cookie(4) | type(1) | tcp_port(2) | server_name(32)
 def pack_offer(tcp_port: int, server_name: str) -> bytes:
     # Build a 39-byte UDP offer: magic cookie + offer type + TCP port + fixed-size server name.
-    return struct.pack("!IBH32s", MAGIC_COOKIE, TYPE_OFFER, tcp_port, pack_name_32(server_name))
+    return _OFFER.pack(MAGIC_COOKIE, TYPE_OFFER, tcp_port, pack_name_32(server_name))
 
 
 def unpack_offer(data: bytes):
     # Validate offer length and header, then return (tcp_port, server_name).
     if len(data) < 39:
         raise ValueError("Offer too short")
-    cookie, mtype, tcp_port, name_bytes = struct.unpack("!IBH32s", data[:39])
+    cookie, mtype, tcp_port, name_bytes = _OFFER.unpack_from(data, 0)
     if cookie != MAGIC_COOKIE or mtype != TYPE_OFFER:
         raise ValueError("Invalid offer")
     return tcp_port, unpack_name_32(name_bytes)
@@ -48,40 +59,49 @@ def pack_request(num_rounds: int, team_name: str) -> bytes:
     # Build a 38-byte TCP request: magic cookie + request type + rounds (1 byte) + fixed-size team name.
     if not (1 <= num_rounds <= 255):
         raise ValueError("num_rounds must be 1..255")
-    return struct.pack("!IBB32s", MAGIC_COOKIE, TYPE_REQUEST, num_rounds, pack_name_32(team_name))
+    return _REQ.pack(MAGIC_COOKIE, TYPE_REQUEST, num_rounds, pack_name_32(team_name))
 
 
 def unpack_request(data: bytes):
     # Validate request length and header, then return (num_rounds, team_name).
     if len(data) < 38:
         raise ValueError("Request too short")
-    cookie, mtype, num_rounds, name_bytes = struct.unpack("!IBB32s", data[:38])
+    cookie, mtype, num_rounds, name_bytes = _REQ.unpack_from(data, 0)
     if cookie != MAGIC_COOKIE or mtype != TYPE_REQUEST:
         raise ValueError("Invalid request")
     return num_rounds, unpack_name_32(name_bytes)
 
 
 # payload client: cookie(4) | type(1) | decision(5)  ("Hittt" / "Stand")
+# Only two client payloads exist, so both are packed once at import.
+_CLI_MSGS = {
+    "Hittt": _CLI.pack(MAGIC_COOKIE, TYPE_PAYLOAD, b"Hittt"),
+    "Stand": _CLI.pack(MAGIC_COOKIE, TYPE_PAYLOAD, b"Stand"),
+}
+
+
 def pack_payload_client(decision: str) -> bytes:
-    # Client gameplay command is exactly 5 ASCII bytes; enforce allowed strings to match server logic.
-    if decision not in ("Hittt", "Stand"):
+    # Client gameplay command is exactly 5 ASCII bytes; only the allowed strings (matching server logic) exist.
+    try:
+        return _CLI_MSGS[decision]
+    except KeyError:
         raise ValueError("decision must be 'Hittt' or 'Stand'")
-    return struct.pack("!IB5s", MAGIC_COOKIE, TYPE_PAYLOAD, decision.encode("ascii"))
 
 
-def unpack_payload_client(data: bytes) -> str:
-    # Validate payload length and header, then return decision string (best-effort decode).
+def unpack_payload_client(data: bytes) -> bytes:
+    # Validate payload length and header, then return the raw 5-byte decision (b"Hittt" / b"Stand").
+    # Works on any buffer (e.g. a reused memoryview); the only copy is the 5-byte decision itself,
+    # returned as bytes so callers can use it as a dict key.
     if len(data) < 10:
         raise ValueError("Payload(client) too short")
-    cookie, mtype, decision = struct.unpack("!IB5s", data[:10])
-    if cookie != MAGIC_COOKIE or mtype != TYPE_PAYLOAD:
+    if data[:5] != _CLI_PREFIX:
         raise ValueError("Invalid payload")
-    return decision.decode("ascii", errors="ignore")
+    return bytes(data[5:10])
 
 
 # payload server: cookie(4) | type(1) | result(1) | rank(2) | suit(1)
 # rank: 1..13, suit: 0..3 (H,D,C,S)
-def pack_payload_server(result: int, rank: int, suit: int) -> bytes:
+def _check_payload_server(result: int, rank: int, suit: int) -> None:
     # Server gameplay payload includes game status (result) plus a card (rank,suit).
     if result not in (RESULT_NOT_OVER, RESULT_TIE, RESULT_LOSS, RESULT_WIN):
         raise ValueError("bad result")
@@ -89,14 +109,31 @@ def pack_payload_server(result: int, rank: int, suit: int) -> bytes:
         raise ValueError("rank must be 1..13")
     if not (0 <= suit <= 3):
         raise ValueError("suit must be 0..3")
-    return struct.pack("!IBBHB", MAGIC_COOKIE, TYPE_PAYLOAD, result, rank, suit)
 
 
-def unpack_payload_server(data: bytes):
-    # Validate payload length and header, then return (result, rank, suit).
-    if len(data) < 9:
+def pack_payload_server(result: int, rank: int, suit: int) -> bytes:
+    # Validate fields, then build a fresh 9-byte server payload.
+    _check_payload_server(result, rank, suit)
+    return _SRV.pack(MAGIC_COOKIE, TYPE_PAYLOAD, result, rank, suit)
+
+
+def pack_payload_server_packed(result: int, card: int) -> bytes:
+    # Same as pack_payload_server, for a packed card int (rank << 2) | suit as used by cards.py.
+    return pack_payload_server(result, card >> 2, card & 3)
+
+
+def unpack_payload_server(data: bytes, offset: int = 0):
+    # Validate payload length and header at data[offset:], then return (result, rank, suit).
+    # offset lets callers parse several back-to-back payloads from one receive buffer.
+    if len(data) - offset < 9:
         raise ValueError("Payload(server) too short")
-    cookie, mtype, result, rank, suit = struct.unpack("!IBBHB", data[:9])
-    if cookie != MAGIC_COOKIE or mtype != TYPE_PAYLOAD:
+    # Cookie + type are checked as one 5-byte compare, then only the body is unpacked.
+    if data[offset:offset + 5] != _SRV_PREFIX:
         raise ValueError("Invalid payload")
+    result, rank, suit = _SRV_TAIL.unpack_from(data, offset + 5)
+    # Range-check the card so callers can index card tables (e.g. CARD_STR) safely.
+    if not (1 <= rank <= 13):
+        raise ValueError("rank must be 1..13")
+    if not (0 <= suit <= 3):
+        raise ValueError("suit must be 0..3")
     return result, rank, suit
@@ -1,7 +1,11 @@
 # server.py
+import logging
+import logging.handlers
+import os
+import queue
 import socket
+import sys
 import threading
-import time
 # Import protocol constants and helper functions
 from protocol import (
     UDP_OFFER_PORT,
@@ -10,32 +14,113 @@ from protocol import (
     RESULT_TIE,
     RESULT_WIN,
     pack_offer,
-    pack_payload_server,
+    pack_payload_server_packed,
     unpack_payload_client,
     unpack_request,
 )
 # Import card game logic
-from cards import Deck, Hand, SUITS, rank_to_str
+from cards import CARD_STR, RANKS, SUITS, Deck, Hand
 
 
-def recv_exact(conn: socket.socket, n: int) -> bytes:
-    # Receive exactly n bytes from the socket
-    data = b""
-    while len(data) < n:
-        chunk = conn.recv(n - len(data))
-        if not chunk:
+def recv_exact_into(conn: socket.socket, mv: memoryview, n: int) -> None:
+    # Receive exactly n bytes from the socket directly into mv[:n]
+    # (the protocol unpackers read the buffer via unpack_from, so nothing is copied out)
+    off = 0
+    while off < n:
+        got = conn.recv_into(mv[off:n])
+        if not got:
             raise ConnectionError("Connection closed by peer")
-        data += chunk
-    return data
+        off += got
 
 
-def safe_print(*args):
-    # Print immediately (no buffering)
-    print(*args, flush=True)
+# SO_REUSEPORT is missing on some platforms (e.g. Windows); detect it once at import.
+_HAVE_REUSEPORT = hasattr(socket, "SO_REUSEPORT")
+
+
+# Writing a card payload straight to the socket's fd skips socket.sendall's wrapper.
+# Only on POSIX: on Windows sockets are not OS file descriptors.
+_FAST_WRITE = os.name == "posix"
+
+
+# Finding the local IPv4 address used for the subnet broadcast target:
+# connect() on a UDP socket to any routable literal address picks the outgoing interface from the
+# routing table without sending a packet or doing a DNS lookup. The address itself is never
+# contacted; it only needs to be covered by the default route.
+_ROUTE_PROBE_ADDR = ("8.8.8.8", 80)
+# Fallback for hosts without a default route (e.g. an isolated LAN): resolve our own hostname,
+# but give up after this many seconds so a slow resolver can't hold up the offers.
+_HOSTNAME_LOOKUP_TIMEOUT = 0.5
+
+
+def _local_ipv4() -> str:
+    # Return this host's primary non-loopback IPv4 address, or "" if none could be found
+    try:
+        probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            probe.connect(_ROUTE_PROBE_ADDR)
+            return probe.getsockname()[0]
+        finally:
+            probe.close()
+    except OSError:
+        pass
+
+    found = []
+
+    def lookup():
+        try:
+            for *_, sockaddr in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET):
+                found.append(sockaddr[0])
+        except OSError:
+            pass
+
+    t = threading.Thread(target=lookup, daemon=True)
+    t.start()
+    t.join(_HOSTNAME_LOOKUP_TIMEOUT)
+    for ip in list(found):
+        if not ip.startswith("127."):
+            return ip
+    return ""
+
+
+# Player actions, and the wire decision each one is sent as.
+# One dict lookup both validates the decision and maps it to the action.
+HIT = 0
+STAND = 1
+_DECISIONS = {b"Hittt": HIT, b"Stand": STAND}
+_ACTION_NAMES = ("Hittt", "Stand")  # indexed by action, for logging
+
+
+# Server log. Records are queued by the game threads and formatted, written to stdout and
+# flushed by a single QueueListener thread, so sessions never block on stdout or on each other.
+# Log calls pass %-style arguments (never f-strings) and those arguments must be immutable
+# (str/int/tuple/exception), since the message is only built later on the listener thread.
+log = logging.getLogger("blackijecky.server")
+_log_queue = queue.SimpleQueue()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Enqueue the record as-is; the default prepare() would format the message right here
+        # on the game thread. Safe because log arguments are immutable (see above).
+        return record
+
+
+def start_log_listener() -> logging.handlers.QueueListener:
+    # Route the server log through the queue to one stdout writer thread; returns the started listener.
+    # The queue handler is installed only once, so starting again doesn't duplicate every line.
+    if not log.handlers:
+        log.addHandler(_DeferredQueueHandler(_log_queue))
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(_log_queue, out)
+    listener.start()
+    return listener
 
 
 class BlackjackServer:
-    def __init__(self, server_name: str = "Blackijecky-Server", max_clients: int = 10):
+    def __init__(self, server_name: str = "Blackijecky-Server", max_clients: int = 10, accept_threads: int = 0):
         # Server name shown in UDP offer
         self.server_name = server_name
         # Event used to stop the server gracefully
@@ -44,42 +129,87 @@ class BlackjackServer:
         # Semaphore to limit number of concurrent clients
         self.client_slots = threading.Semaphore(max_clients)
 
-        # Create TCP socket
-        self.tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.tcp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        # Bind to any available port
-        self.tcp_sock.bind(("", 0))  # 0.0.0.0:any
-        self.tcp_sock.listen(20)
+        # Every possible server payload (4 results x 52 cards), packed once at startup.
+        # Indexed by (result << 6) | card, where card is the packed (rank << 2) | suit int (< 64).
+        self._card_pkt = [b""] * (4 << 6)
+        for result in (RESULT_NOT_OVER, RESULT_TIE, RESULT_LOSS, RESULT_WIN):
+            for rank in RANKS:
+                for suit in range(len(SUITS)):
+                    card = (rank << 2) | suit
+                    self._card_pkt[(result << 6) | card] = pack_payload_server_packed(result, card)
+
+        # Create TCP socket (with SO_REUSEPORT where available, so more listeners can share the port)
+        reuse_port = _HAVE_REUSEPORT
+        try:
+            self.tcp_sock = self._make_listener(0, reuse_port)  # 0.0.0.0:any
+        except OSError:
+            # SO_REUSEPORT exists but was refused: fall back to a single plain listener
+            reuse_port = False
+            self.tcp_sock = self._make_listener(0, False)
         # Save the chosen TCP port
         self.tcp_port = self.tcp_sock.getsockname()[1]
 
+        # With SO_REUSEPORT, open extra listeners on the same port (one accept thread each),
+        # so the kernel spreads incoming connections instead of funnelling them through one queue.
+        # Default is one listener per CPU, but never more than max_clients (more accept threads
+        # than sessions can't help); without SO_REUSEPORT there is a single listener.
+        self.tcp_socks = [self.tcp_sock]
+        if reuse_port:
+            for _ in range((accept_threads or min(os.cpu_count() or 1, max_clients)) - 1):
+                try:
+                    self.tcp_socks.append(self._make_listener(self.tcp_port, True))
+                except OSError:
+                    break
+
         # Create UDP socket for broadcasting offers
         self.udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
         self.udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
+    def _make_listener(self, port: int, reuse_port: bool) -> socket.socket:
+        # Create a listening TCP socket bound to the given port (0 = any available port).
+        # Raises OSError (socket closed) if any option, bind or listen fails.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(("", port))
+            sock.listen(20)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
     def start(self):
         # Start server main loop
-        safe_print(f"Server started, listening on TCP port {self.tcp_port}")
+        listener = start_log_listener()
+        log.info("Server started, listening on TCP port %d", self.tcp_port)
         # Start UDP offer thread
         threading.Thread(target=self._offer_loop, daemon=True).start()
-        # Start TCP accept thread
-        threading.Thread(target=self._accept_loop, daemon=True).start()
-        # Keep server alive
+        # Start one TCP accept thread per listening socket
+        for sock in self.tcp_socks:
+            threading.Thread(target=self._accept_loop, args=(sock,), daemon=True).start()
+        # Keep server alive: block on the stop event instead of waking up every second.
+        # On Windows a blocking lock wait cannot be interrupted by Ctrl+C, so poll there.
         try:
-            while True:
-                time.sleep(1)
+            while not self._stop.wait(None if os.name == "posix" else 1.0):
+                pass
         except KeyboardInterrupt:
             # Stop server on Ctrl+C
-            safe_print("Shutting down...")
+            log.info("Shutting down...")
             self._stop.set()
-            try:
-                self.tcp_sock.close()
-            except Exception:
-                pass
+            for sock in self.tcp_socks:
+                try:
+                    sock.close()
+                except Exception:
+                    pass
             try:
                 self.udp_sock.close()
             except Exception:
                 pass
+        finally:
+            # Write out any queued log lines before returning, however the loop ended
+            listener.stop()
 
     def _offer_loop(self):
         # Create UDP offer packet
@@ -89,33 +219,36 @@ class BlackjackServer:
         targets = [("255.255.255.255", UDP_OFFER_PORT)]
         # Try to add local subnet broadcast
         try:
-            local_ip = socket.gethostbyname(socket.gethostname())
+            local_ip = _local_ipv4()
             if local_ip and local_ip.count(".") == 3:
                 parts = local_ip.split(".")
                 parts[-1] = "255"
                 targets.append((".".join(parts), UDP_OFFER_PORT))
         except Exception:
             pass
-        # Send offers repeatedly
+        # Loop invariants: bound send method and a fixed tuple of targets
+        send = self.udp_sock.sendto
+        targets = tuple(targets)
+        # Send offers repeatedly (wait() returns early as soon as the server is stopped)
         while not self._stop.is_set():
             for target in targets:
                 try:
-                    self.udp_sock.sendto(offer, target)
+                    send(offer, target)
                 except Exception:
                     pass
-            time.sleep(1)
+            self._stop.wait(1.0)
 
-    def _accept_loop(self):
-        # Accept incoming TCP clients
+    def _accept_loop(self, sock: socket.socket):
+        # Accept incoming TCP clients on one listening socket
         while not self._stop.is_set():
             try:
-                conn, addr = self.tcp_sock.accept()
+                conn, addr = sock.accept()
             except OSError:
                 break
 
             # Reject client if server is full
             if not self.client_slots.acquire(blocking=False):
-                safe_print(f"Rejecting {addr}: server busy")
+                log.info("Rejecting %s: server busy", addr)
                 try:
                     conn.close()
                 except Exception:
@@ -132,35 +265,49 @@ class BlackjackServer:
             self.client_slots.release()
 
     def _sanitize_team_name(self, name: str) -> str:
-        # Remove non-printable characters
-        name = "".join(ch if ch.isprintable() else "?" for ch in (name or ""))
-        name = name.strip()
-        if not name:
-            name = "UnknownTeam"
-        return name[:32]
+        # Replace non-printable characters with "?"; a single C-level isprintable() check
+        # lets the usual all-printable name skip the per-character pass entirely
+        name = name or ""
+        if not name.isprintable():
+            name = "".join(ch if ch.isprintable() else "?" for ch in name)
+        return name.strip()[:32] or "UnknownTeam"
 
     def _handle_client(self, conn: socket.socket, addr):
-        safe_print(f"Client connected from {addr}")
+        log.info("Client connected from %s", addr)
 
         try:
+            # Disable Nagle: 9-byte card sends must not wait for the client's delayed ACK
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Intentional override of the kernel default: the server never has more than
+            # a 27-byte initial deal in flight, so a small send buffer is plenty per client
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16384)
             # Timeout for request phase
             conn.settimeout(20)
+            # Per-connection receive buffer, reused for the request and every decision packet
+            # (decisions are parsed in place from it, so no bytes/str is created per packet)
+            rx = memoryview(bytearray(64))
             # Read request packet
-            req = recv_exact(conn, 38)
-            num_rounds, team_name = unpack_request(req)
+            recv_exact_into(conn, rx, 38)
+            num_rounds, team_name = unpack_request(rx)
             team_name = self._sanitize_team_name(team_name)
             # Validate number of rounds
             if not (1 <= num_rounds <= 255):
                 raise ValueError(f"Invalid rounds: {num_rounds}")
 
-            # Ignore optional newline
+            # Ignore optional newline: it is normally sent together with the request, so just peek
+            # without waiting and consume it only if it is really there. If it arrives later,
+            # the first decision read skips it instead (see _read_decision).
+            # (the gameplay settimeout() below switches the socket back to blocking mode)
+            newline_pending = True
             try:
-                conn.settimeout(0.2)
-                _ = conn.recv(1)
+                conn.setblocking(False)
+                if conn.recv(1, socket.MSG_PEEK) == b"\n":
+                    conn.recv(1)
+                    newline_pending = False
             except Exception:
                 pass
 
-            safe_print(f"Request from team '{team_name}' rounds={num_rounds}")
+            log.info("Request from team '%s' rounds=%d", team_name, num_rounds)
 
             wins = losses = ties = 0
 
@@ -168,8 +315,8 @@ class BlackjackServer:
             conn.settimeout(300)
             # Play rounds
             for r in range(1, num_rounds + 1):
-                safe_print(f"[{team_name}] Round {r}/{num_rounds} starting")
-                result = self._play_round(conn, team_name)
+                log.info("[%s] Round %d/%d starting", team_name, r, num_rounds)
+                result = self._play_round(conn, rx, team_name, skip_newline=newline_pending and r == 1)
 
                 if result == RESULT_WIN:
                     wins += 1
@@ -178,43 +325,59 @@ class BlackjackServer:
                 else:
                     ties += 1
 
-                safe_print(f"[{team_name}] Stats: W={wins} L={losses} T={ties}")
+                log.info("[%s] Stats: W=%d L=%d T=%d", team_name, wins, losses, ties)
 
         except (socket.timeout,) as e:
-            safe_print(f"Client {addr} timeout: {e}")
+            log.info("Client %s timeout: %s", addr, e)
         except (ConnectionError, ConnectionResetError, BrokenPipeError, OSError) as e:
-            safe_print(f"Client {addr} disconnected unexpectedly: {e}")
+            log.info("Client %s disconnected unexpectedly: %s", addr, e)
         except Exception as e:
-            safe_print(f"Client {addr} error: {e}")
+            log.info("Client %s error: %s", addr, e)
         finally:
             try:
                 conn.close()
             except Exception:
                 pass
-            safe_print(f"Client {addr} disconnected")
+            log.info("Client %s disconnected", addr)
 
-    def _send_card(self, conn: socket.socket, result: int, card):
-        # Send card and result to client
-        rank, suit = card
-        msg = pack_payload_server(result, rank, suit)
+    def _send_card(self, conn: socket.socket, result: int, card: int):
+        # Send card (packed int) and result to client using the prebuilt payload table
+        msg = self._card_pkt[(result << 6) | card]
+        if _FAST_WRITE:
+            # A 9-byte write normally completes in one go; fall back to sendall for any remainder
+            try:
+                n = os.write(conn.fileno(), msg)
+            except BlockingIOError:
+                n = 0
+            if n == len(msg):
+                return
+            msg = msg[n:]
         conn.sendall(msg)
 
-    def _read_decision(self, conn: socket.socket, team_name: str) -> str:
-        # Read exactly 10 bytes decision packet
-        decision_msg = recv_exact(conn, 10)
+    def _read_decision(self, conn: socket.socket, rx: memoryview, team_name: str, skip_newline: bool = False) -> int:
+        # Read exactly 10 bytes decision packet into the connection's receive buffer
+        recv_exact_into(conn, rx, 10)
+        if skip_newline and rx[0] == 0x0A:
+            # The request's optional newline arrived late (packets start with the cookie, never "\n"):
+            # drop it and read the one byte still missing from the decision
+            rx[0:9] = bytes(rx[1:10])
+            recv_exact_into(conn, rx[9:], 1)
         try:
-            decision = unpack_payload_client(decision_msg)
+            # Parsed straight from rx; the 5-byte decision is the only copy made
+            decision = unpack_payload_client(rx)
         except Exception:
             raise ValueError("Invalid decision payload from client")
 
-        # Validate decision value
-        if decision not in ("Hittt", "Stand"):
-            raise ValueError(f"Invalid decision value from client: {decision}")
+        # Validate decision value and map it to HIT/STAND in a single lookup
+        action = _DECISIONS.get(decision, -1)
+        if action == -1:
+            raise ValueError(f"Invalid decision value from client: {decision.decode('ascii', errors='replace')}")
 
-        safe_print(f"[{team_name}] Decision: {decision}")
-        return decision
+        if log.isEnabledFor(logging.INFO):
+            log.info("[%s] Decision: %s", team_name, _ACTION_NAMES[action])
+        return action
 
-    def _play_round(self, conn: socket.socket, team_name: str) -> int:
+    def _play_round(self, conn: socket.socket, rx: memoryview, team_name: str, skip_newline: bool = False) -> int:
         # Create deck and hands
         deck = Deck()
         player = Hand()
@@ -230,60 +393,66 @@ class BlackjackServer:
         player.add(p2)
         dealer.add(d1)
         dealer.add(d2)
-        # Send initial cards
-        self._send_card(conn, RESULT_NOT_OVER, p1)
-        self._send_card(conn, RESULT_NOT_OVER, p2)
-        self._send_card(conn, RESULT_NOT_OVER, d1)
-
-        safe_print(f"[{team_name}] Player: {player} (total={player.total()})")
-        safe_print(f"[{team_name}] Dealer shows: {rank_to_str(d1[0])} of {SUITS[d1[1]]}")
-
-        # Player turn
+        # Send initial cards as one 27-byte write (the client reads them in one batch too)
+        pkt = self._card_pkt
+        base = RESULT_NOT_OVER << 6
+        conn.sendall(pkt[base | p1] + pkt[base | p2] + pkt[base | d1])
+
+        # Per-card log lines are skipped entirely (no argument work) when INFO is disabled
+        verbose = log.isEnabledFor(logging.INFO)
+        if verbose:
+            log.info("[%s] Player: %s (total=%d)", team_name, str(player), player.total())
+            log.info("[%s] Dealer shows: %s", team_name, CARD_STR[d1])
+
+        # Player turn (only the round's first decision may need to skip a late request newline)
         while True:
-            decision = self._read_decision(conn, team_name)
-            if decision == "Stand":
+            action = self._read_decision(conn, rx, team_name, skip_newline)
+            skip_newline = False
+            if action == STAND:
                 break
 
             # Hit
             new_card = deck.draw()
             player.add(new_card)
+            # Compute the total once, reused by the bust check, the send decision and the log line
+            p_total = player.total()
 
-            if player.bust():
+            if p_total > 21:
                 self._send_card(conn, RESULT_LOSS, new_card)
-                safe_print(
-                    f"[{team_name}] Player HIT -> {rank_to_str(new_card[0])} of {SUITS[new_card[1]]} "
-                    f"BUST (total={player.total()})"
-                )
+                if verbose:
+                    log.info("[%s] Player HIT -> %s BUST (total=%d)", team_name, CARD_STR[new_card], p_total)
                 return RESULT_LOSS
 
             self._send_card(conn, RESULT_NOT_OVER, new_card)
-            safe_print(
-                f"[{team_name}] Player HIT -> {rank_to_str(new_card[0])} of {SUITS[new_card[1]]} "
-                f"(total={player.total()})"
-            )
+            if verbose:
+                log.info("[%s] Player HIT -> %s (total=%d)", team_name, CARD_STR[new_card], p_total)
 
         # Dealer reveals hidden card
+        d_total = dealer.total()
         self._send_card(conn, RESULT_NOT_OVER, d2)
-        safe_print(f"[{team_name}] Dealer reveals: {rank_to_str(d2[0])} of {SUITS[d2[1]]} (total={dealer.total()})")
+        if verbose:
+            log.info("[%s] Dealer reveals: %s (total=%d)", team_name, CARD_STR[d2], d_total)
 
         last_dealer_card = d2
-        # Dealer draws until 17
-        while dealer.total() < 17:
+        # Dealer draws until 17 (d_total is refreshed once per draw)
+        while d_total < 17:
             c = deck.draw()
             dealer.add(c)
+            d_total = dealer.total()
             last_dealer_card = c
 
-            if dealer.bust():
+            if d_total > 21:
                 self._send_card(conn, RESULT_WIN, c)
-                safe_print(f"[{team_name}] Dealer draws {rank_to_str(c[0])} of {SUITS[c[1]]} -> BUST (total={dealer.total()})")
+                if verbose:
+                    log.info("[%s] Dealer draws %s -> BUST (total=%d)", team_name, CARD_STR[c], d_total)
                 return RESULT_WIN
 
             self._send_card(conn, RESULT_NOT_OVER, c)
-            safe_print(f"[{team_name}] Dealer draws {rank_to_str(c[0])} of {SUITS[c[1]]} (total={dealer.total()})")
+            if verbose:
+                log.info("[%s] Dealer draws %s (total=%d)", team_name, CARD_STR[c], d_total)
 
-        # Compare totals
+        # Compare totals (d_total is already current from the dealer loop)
         p_total = player.total()
-        d_total = dealer.total()
 
         if p_total > d_total:
             final = RESULT_WIN
@@ -292,8 +461,9 @@ class BlackjackServer:
         else:
             final = RESULT_TIE
 
+        # Per the protocol, the result travels with the dealer's last card sent again
         self._send_card(conn, final, last_dealer_card)
-        safe_print(f"[{team_name}] Final: player={p_total} dealer={d_total} -> result={final}")
+        log.info("[%s] Final: player=%d dealer=%d -> result=%d", team_name, p_total, d_total, final)
         return final
 
 